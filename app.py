@@ -2,36 +2,70 @@ import nest_asyncio
 nest_asyncio.apply()
 
 import httpx
+import numpy as np
+from authlib.integrations.base_client import OAuthError
+from authlib.integrations.httpx_client import AsyncOAuth2Client
 from fredapi import Fred
 from schwab.auth import easy_client
 from schwab.orders.equities import equity_buy_market, equity_sell_short_market, equity_sell_market, equity_buy_to_cover_market
 import asyncio
+import logging
 import os
+import random
+import sys
+from collections import defaultdict
+try:
+    import orjson as json
+except ImportError:
+    import json
+import time
 from datetime import datetime
 from dotenv import load_dotenv
-from models import calculate_delta, calculate_implied_volatility_baw
+from models import calculate_implied_volatility_and_delta_vec
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Constants and Global Variables
+logger = logging.getLogger(__name__)
 config = {}
 risk_free_rate = 0.0
+risk_free_rate_updated = 0.0
+fred = None
 client = None
+contracts = {}
+dividend_yields = {}
+leg_states = {}
+QUOTE_TIMEOUT = 20.0
+MAX_CONCURRENT_QUOTE_REQUESTS = 8
+MAX_REQUEST_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.2
+SPOT_MOVE_THRESHOLD = 1e-3
+LEG_SPOT_TOLERANCE = 1e-4
+LEG_PRICE_TOLERANCE = 1e-3
+LEG_STATE_MAX_AGE = 300.0
+RISK_FREE_RATE_TTL = 24 * 3600
+DIVIDEND_YIELD_TTL = 24 * 3600
+LARGE_PAYLOAD_SIZE = 1024 * 1024
+quote_semaphore = asyncio.Semaphore(MAX_CONCURRENT_QUOTE_REQUESTS)
 
 async def main():
     """
     Main function to initialize the bot.
     """
-    global client, risk_free_rate
+    global client, fred
     
-    precompile_numba_functions()
     load_config()
+    # Configure only this module's logger; a root handler would also print httpx's
+    # per-request INFO lines, which include the account hash and token requests.
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(config["LOG_LEVEL"])
 
     try:
         fred = Fred(api_key=config["FRED_API_KEY"])
-        sofr_data = fred.get_series('SOFR')
-        risk_free_rate = (sofr_data.iloc[-1] / 100)
+        await refresh_risk_free_rate()
     except Exception as e:
         print("FRED API Error", f"Invalid FRED API Key: {str(e)}")
         return
@@ -43,6 +77,7 @@ async def main():
             app_secret=config["SCHWAB_SECRET"],
             callback_url=config["SCHWAB_CALLBACK_URL"],
             asyncio=True)
+        await configure_connection_pool()
         print("Login successful.\n")
     except Exception as e:
         print("Login Failed", f"An error occurred: {str(e)}")
@@ -58,65 +93,173 @@ async def main():
         print("Error fetching account IDs:", f"An error occurred: {str(e)}")
         return
 
+    try:
+        await run_hedging_loop()
+    finally:
+        await client.close_async_session()
+
+async def configure_connection_pool():
+    """
+    Replace the Schwab client's OAuth session with one that keeps a bounded pool of HTTP/2 connections.
+
+    schwab-py builds its session with httpx defaults and offers no way to pass pool
+    settings, so an equivalent session is rebuilt from the existing token and
+    credentials. Token refreshes keep writing to token.json through the original
+    update_token callback.
+    """
+    session = client.session
+    client.session = AsyncOAuth2Client(
+        session.client_id,
+        client_secret=session.client_secret,
+        token=session.token,
+        token_endpoint=session.metadata.get('token_endpoint'),
+        update_token=session.update_token,
+        leeway=session.leeway,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        timeout=30.0)
+    await session.aclose()
+
+async def run_hedging_loop():
+    """
+    Rebalance the delta hedge every HEDGING_FREQUENCY seconds.
+
+    The Schwab client created in main is reused for every iteration, so its pooled
+    connection is kept alive between rebalances instead of being re-established.
+
+    After a cycle that needed no adjustment, the next cycle is skipped as long as
+    positions are unchanged and no underlying spot has moved by SPOT_MOVE_THRESHOLD
+    or more since that cycle. Skipping stops once that cycle is older than
+    LEG_STATE_MAX_AGE seconds, so option price changes and time decay are still
+    picked up when spots are flat.
+    """
+    account_hash = config["SCHWAB_ACCOUNT_HASH"]
+    freq = config["HEDGING_FREQUENCY"]
+    positions_field = (client.Account.Fields.POSITIONS,)
+    hedged_signature, hedged_spots, hedged_at = None, {}, 0.0
+    stocks, options, streamers_tickers, deltas, stocks_to_hedge = {}, defaultdict(dict), defaultdict(list), {}, {}
+    times_to_expiry, legs, leg_symbols, pending_orders, unquoted = {}, {}, [], [], set()
+
     while True:
-        stocks, options, streamers_tickers, deltas, stocks_to_hedge = {}, {}, {}, {}, {}
+        for container in (stocks, options, streamers_tickers, deltas, stocks_to_hedge, times_to_expiry, legs, leg_symbols, pending_orders, unquoted):
+            container.clear()
+        positions_signature, underlying_spots, hedged = None, {}, True
+
+        rate_refresh = asyncio.create_task(refresh_risk_free_rate())
 
         try:
-            resp = await client.get_account(config["SCHWAB_ACCOUNT_HASH"], fields=[client.Account.Fields.POSITIONS])
+            resp = await with_retry(lambda: client.get_account(account_hash, fields=positions_field))
             assert resp.status_code == httpx.codes.OK
 
-            account_data = resp.json()
-            positions = account_data["securitiesAccount"]["positions"]
+            account_data = await decode_json(resp.content)
+            # Schwab omits the positions key entirely on an account with no holdings
+            positions = account_data.get("securitiesAccount", {}).get("positions") or ()
 
+            holdings = []
             for position in positions:
-                asset_type = position["instrument"]["assetType"]
+                instrument = position["instrument"]
+                asset_type = instrument["assetType"]
+                symbol = instrument["symbol"]
+                net_quantity = float(position["longQuantity"]) - float(position["shortQuantity"])
+                holdings.append((symbol, net_quantity))
 
                 if asset_type == "EQUITY":
-                    symbol = position["instrument"]["symbol"]
-                    stocks[symbol] = round(float(position["longQuantity"]) - float(position["shortQuantity"]))
+                    stocks[symbol] = round(net_quantity)
 
                 elif asset_type == "OPTION":
-                    underlying_symbol = position["instrument"]["underlyingSymbol"]
-                    if underlying_symbol not in streamers_tickers:
-                        options[underlying_symbol] = {}
-                        streamers_tickers[underlying_symbol] = []
-                    options[underlying_symbol][position["instrument"]["symbol"]] = position
-                    streamers_tickers[underlying_symbol].append(position["instrument"]["symbol"])
+                    underlying_symbol = instrument["underlyingSymbol"]
+                    options[underlying_symbol][symbol] = position
+                    streamers_tickers[underlying_symbol].append(symbol)
+
+            positions_signature = tuple(sorted(holdings))
+        except (httpx.HTTPError, OAuthError, asyncio.TimeoutError, AssertionError, KeyError, ValueError) as e:
+            logger.error("Error fetching account positions: An error occurred: %s", e)
+
+        tickers_list = [ticker for ticker in options if len(streamers_tickers[ticker]) != 0]
+
+        # One column per leg input, filled in place as quotes arrive
+        leg_count = sum(len(streamers_tickers[ticker]) for ticker in tickers_list)
+        prices, spots, strikes, expiries, div_yields, quantities = (np.empty(leg_count) for _ in range(6))
+        is_calls = np.empty(leg_count, dtype=np.bool_)
+        underlying_ids = np.empty(leg_count, dtype=np.intp)
+        filled = 0
+
+        quote_tasks = {}
+        for ticker in tickers_list:
+            fields = None
+            if time.time() - dividend_yields.get(ticker, (0.0, 0.0))[1] < DIVIDEND_YIELD_TTL:
+                fields = [client.Quote.Fields.QUOTE]
+            quote_tasks[asyncio.create_task(fetch_quotes([ticker] + streamers_tickers[ticker], fields))] = ticker
+        current_time = datetime.now()
+
+        # Fill each underlying's legs as soon as its quotes arrive rather than in list order
+        pending = set(quote_tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                ticker = quote_tasks[task]
+                try:
+                    quote_data = task.result()
+                    stock_quote_data = quote_data[ticker]
+                    S = round((stock_quote_data['quote']['bidPrice'] + stock_quote_data['quote']['askPrice']) / 2, 3)
+                    underlying_spots[ticker] = S
+                    if "fundamental" in stock_quote_data:
+                        dividend_yields[ticker] = (float(stock_quote_data["fundamental"]["divYield"]) / 100, time.time())
+                    div_yield = dividend_yields[ticker][0]
+
+                    # Legs are written after the last committed underlying; a failure part way
+                    # through leaves filled unchanged, so the next underlying overwrites them.
+                    for i, quote in enumerate(streamers_tickers[ticker], filled):
+                        prices[i] = (quote_data[quote]["quote"]["bidPrice"] + quote_data[quote]["quote"]["askPrice"]) / 2
+                        if quote not in contracts:
+                            contracts[quote] = parse_option_symbol(quote)
+                        expiration_time, strikes[i], is_calls[i] = contracts[quote]
+                        if expiration_time not in times_to_expiry:
+                            times_to_expiry[expiration_time] = (expiration_time - current_time).total_seconds() / (365 * 24 * 3600)
+                        expiries[i] = times_to_expiry[expiration_time]
+                        quantities[i] = float(options[ticker][quote]["longQuantity"]) - float(options[ticker][quote]["shortQuantity"])
+                        spots[i], div_yields[i], underlying_ids[i] = S, div_yield, len(legs)
+                except Exception as e:
+                    logger.error("Error fetching quotes: An error occurred for %s: %s", ticker, e)
+                    # Without its legs the underlying would look unhedged and have its share
+                    # hedge flattened, so leave it untouched and re-check it next cycle.
+                    unquoted.add(ticker)
+                    hedged = False
+                    continue
+
+                legs[ticker] = len(legs)
+                filled += len(streamers_tickers[ticker])
+                leg_symbols.extend(streamers_tickers[ticker])
+
+        try:
+            await rate_refresh
         except Exception as e:
-            print("Error fetching account positions:", f"An error occurred: {str(e)}")
+            logger.error("FRED API Error: Keeping previous risk-free rate: %s", e)
+
+        if (positions_signature is not None and positions_signature == hedged_signature and time.time() - hedged_at < LEG_STATE_MAX_AGE
+                and underlying_spots.keys() == hedged_spots.keys()
+                and all(abs(underlying_spots[ticker] - hedged_spots[ticker]) < SPOT_MOVE_THRESHOLD * hedged_spots[ticker] for ticker in underlying_spots)):
+            logger.info("Positions unchanged and spot moves below threshold. Skipping rebalance.")
+            await asyncio.sleep(freq)
+            continue
+
+        if filled != 0:
+            leg_sigmas, leg_deltas = solve_legs(leg_symbols, prices[:filled], spots[:filled], strikes[:filled],
+                                                expiries[:filled], div_yields[:filled], is_calls[:filled])
+            underlying_ids = underlying_ids[:filled]
+            underlying_deltas = np.bincount(underlying_ids, weights=leg_deltas * quantities[:filled], minlength=len(legs)) * 100.0
+            underlying_low_vols = np.bincount(underlying_ids, weights=leg_sigmas < 0.005, minlength=len(legs)) > 0
 
         for ticker in options:
+            if ticker in unquoted:
+                logger.warning("UNDERLYING SYMBOL: %s not evaluated: quotes unavailable, hedge left unchanged.", ticker)
+                continue
+
             total_deltas = 0.0
-            if len(streamers_tickers[ticker]) != 0:
-                try:
-                    resp = await client.get_quote(ticker)
-                    assert resp.status_code == httpx.codes.OK
-
-                    stock_quote_data = resp.json()
-                    S = round((stock_quote_data[ticker]['quote']['bidPrice'] + stock_quote_data[ticker]['quote']['askPrice']) / 2, 3)
-                    div_yield = float(stock_quote_data[ticker]["fundamental"]["divYield"]) / 100
-                    current_time = datetime.now()
-
-                    resp = await client.get_quotes(streamers_tickers[ticker])
-                    assert resp.status_code == httpx.codes.OK
-
-                    quote_data = resp.json()
-                    for quote in quote_data:
-                        price = (quote_data[quote]["quote"]["bidPrice"] + quote_data[quote]["quote"]["askPrice"]) / 2
-                        expiration_time = datetime(quote_data[quote]['reference']['expirationYear'], quote_data[quote]['reference']['expirationMonth'], quote_data[quote]['reference']['expirationDay'])
-                        T = (expiration_time - current_time).total_seconds() / (365 * 24 * 3600)
-                        K = float(quote_data[quote]['reference']['strikePrice'])
-                        option_type = 'calls' if quote_data[quote]['reference']['contractType'] == 'C' else 'puts'
-
-                        sigma = calculate_implied_volatility_baw(price, S, K, risk_free_rate, T, q=div_yield, option_type=option_type)
-                        delta = calculate_delta(S, K, T, risk_free_rate, sigma, q=div_yield, option_type=option_type)
-                        if (sigma < 0.005):
-                            stocks_to_hedge[ticker] = False
-
-                        quantity = float(options[ticker][quote]["longQuantity"]) - float(options[ticker][quote]["shortQuantity"])
-                        total_deltas += (delta * quantity * 100.0)
-                except Exception as e:
-                    print("Error fetching quotes:", f"An error occurred: {str(e)}")
+            if ticker in legs:
+                if underlying_low_vols[legs[ticker]]:
+                    stocks_to_hedge[ticker] = False
+                total_deltas = float(underlying_deltas[legs[ticker]])
             deltas[ticker] = round(total_deltas)
             if ticker not in stocks_to_hedge:
                 stocks_to_hedge[ticker] = True
@@ -129,81 +272,231 @@ async def main():
             else:
                 delta_imbalance = 0
 
-            print(f"UNDERLYING SYMBOL: {ticker}")
-            print(f"TOTAL SHARES: {total_shares}")
-            print(f"TOTAL DELTAS: {total_deltas}")
-            print(f"DELTA IMBALANCE: {delta_imbalance}")
-
-            if delta_imbalance != 0:
-                if delta_imbalance > 0:
-                    print(f"ADJUSTMENT NEEDED: Going short {delta_imbalance} shares to hedge the delta exposure.")
-
-                    try:
-                        if config["DRY_RUN"] != True:
-                            order = equity_sell_short_market(ticker, int(delta_imbalance)).build()
-                            print(f"Order placed for -{delta_imbalance} shares...")
-                            resp = await client.place_order(config["SCHWAB_ACCOUNT_HASH"], order)
-                            assert resp.status_code == httpx.codes.OK
-                    except Exception as e:
-                        print(f"{e}")
-
-                else:
-                    print(f"ADJUSTMENT NEEDED: Going long {-1 * delta_imbalance} shares to hedge the delta exposure.")
-
-                    try:
-                        if config["DRY_RUN"] != True:
-                            order = equity_buy_market(ticker, int(-1 * delta_imbalance)).build()
-                            print(f"Order placed for +{-1 * delta_imbalance} shares...")
-                            resp = await client.place_order(config["SCHWAB_ACCOUNT_HASH"], order)
-                            assert resp.status_code == httpx.codes.OK
-                    except Exception as e:
-                        print(f"{e}")
-            else:
-                print(f"No adjustment needed. Delta is perfectly hedged with shares.")  
-            print()
+            hedged = hedged and delta_imbalance == 0
+            order = rebalance(ticker, total_shares, total_deltas, delta_imbalance, equity_sell_short_market, equity_buy_market)
+            if order is not None:
+                pending_orders.append((ticker, order))
 
         for ticker in stocks:
             if ticker not in options:
                 total_shares = stocks.get(ticker, 0)
                 total_deltas = 0
-
-                print(f"UNDERLYING SYMBOL: {ticker}")
-                print(f"TOTAL SHARES: {total_shares}")
-                print(f"TOTAL DELTAS: {total_deltas}")
-                print(f"DELTA IMBALANCE: {delta_imbalance}")
-
                 delta_imbalance = total_shares + total_deltas
 
-                if delta_imbalance != 0:
-                    if delta_imbalance > 0:
-                        print(f"ADJUSTMENT NEEDED: Going short {delta_imbalance} shares to hedge the delta exposure.")
-
-                        try:
-                            if config["DRY_RUN"] != True:
-                                order = equity_sell_market(ticker, int(delta_imbalance)).build()
-                                print(f"Order placed for -{delta_imbalance} shares...")
-                                resp = await client.place_order(config["SCHWAB_ACCOUNT_HASH"], order)
-                                assert resp.status_code == httpx.codes.OK
-                        except Exception as e:
-                            print(f"{e}")
-
-                    else:
-                        print(f"ADJUSTMENT NEEDED: Going long {-1 * delta_imbalance} shares to hedge the delta exposure.")
-
-                        try:
-                            if config["DRY_RUN"] != True:
-                                order = equity_buy_to_cover_market(ticker, int(-1 * delta_imbalance)).build()
-                                print(f"Order placed for +{-1 * delta_imbalance} shares...")
-                                resp = await client.place_order(config["SCHWAB_ACCOUNT_HASH"], order)
-                                assert resp.status_code == httpx.codes.OK
-                        except Exception as e:
-                            print(f"{e}")
-                else:
-                    print(f"No adjustment needed. Delta is perfectly hedged with shares.")  
-                print()
-
-        await asyncio.sleep(config["HEDGING_FREQUENCY"])
+                hedged = hedged and delta_imbalance == 0
+                order = rebalance(ticker, total_shares, total_deltas, delta_imbalance, equity_sell_market, equity_buy_to_cover_market)
+                if order is not None:
+                    pending_orders.append((ticker, order))
+
+        if len(pending_orders) != 0:
+            results = await asyncio.gather(*[client.place_order(account_hash, order) for _, order in pending_orders], return_exceptions=True)
+            for (ticker, _), result in zip(pending_orders, results):
+                if isinstance(result, Exception):
+                    logger.error("Order for %s failed: %s", ticker, result)
+                elif result.status_code not in (httpx.codes.OK, httpx.codes.CREATED):
+                    logger.error("Order for %s failed: %s %s", ticker, result.status_code, result.text)
+
+        if hedged:
+            hedged_signature, hedged_spots, hedged_at = positions_signature, underlying_spots, time.time()
+        else:
+            hedged_signature, hedged_spots = None, {}
+
+        await asyncio.sleep(freq)
         
+def rebalance(ticker, total_shares, total_deltas, delta_imbalance, sell_order, buy_order):
+    """
+    Report the hedge state of an underlying and build the order that offsets its delta imbalance.
+
+    Orders are returned rather than placed so that all of a cycle's orders can be
+    submitted together.
+
+    Parameters:
+    - ticker (str): Underlying symbol.
+    - total_shares (int): Shares currently held.
+    - total_deltas (int): Share-equivalent delta of the option legs.
+    - delta_imbalance (int): Net delta to offset; positive values are sold, negative values bought.
+    - sell_order (callable): Schwab equity order builder used when shares must be sold.
+    - buy_order (callable): Schwab equity order builder used when shares must be bought.
+
+    Returns:
+    - dict: The order to place, or None if no adjustment is needed or DRY_RUN is set.
+    """
+    order = None
+
+    logger.info("UNDERLYING SYMBOL: %s", ticker)
+    logger.info("TOTAL SHARES: %s", total_shares)
+    logger.info("TOTAL DELTAS: %s", total_deltas)
+    logger.info("DELTA IMBALANCE: %s", delta_imbalance)
+
+    if delta_imbalance != 0:
+        quantity = abs(delta_imbalance)
+        if delta_imbalance > 0:
+            build_order, direction, sign = sell_order, "short", "-"
+        else:
+            build_order, direction, sign = buy_order, "long", "+"
+
+        logger.info("ADJUSTMENT NEEDED: Going %s %s shares to hedge the delta exposure.", direction, quantity)
+
+        try:
+            if config["DRY_RUN"] != True:
+                order = build_order(ticker, quantity).build()
+                logger.info("Order placed for %s%s shares...", sign, quantity)
+        except Exception as e:
+            logger.error("%s", e)
+    else:
+        logger.info("No adjustment needed. Delta is perfectly hedged with shares.")
+
+    return order
+
+def solve_legs(symbols, prices, spots, strikes, expiries, div_yields, is_calls):
+    """
+    Solve implied volatility and delta for every option leg, reusing results from earlier cycles.
+
+    A leg is only re-solved when its underlying spot has moved by more than
+    LEG_SPOT_TOLERANCE or its option price by more than LEG_PRICE_TOLERANCE
+    (relative) since it was last solved, or when that solve is older than
+    LEG_STATE_MAX_AGE seconds so time decay is picked up; otherwise its previous
+    sigma and delta are kept. States of legs no longer held are dropped.
+
+    Parameters:
+    - symbols (list): Option symbols, one per leg.
+    - prices (ndarray): Option mid prices.
+    - spots (ndarray): Underlying mid prices.
+    - strikes (ndarray): Strike prices.
+    - expiries (ndarray): Times to expiration in years.
+    - div_yields (ndarray): Continuous dividend yields.
+    - is_calls (ndarray): True for calls, False for puts.
+
+    Returns:
+    - tuple: Arrays of implied volatilities and deltas.
+    """
+    sigmas, deltas = np.empty(len(symbols)), np.empty(len(symbols))
+    stale = np.ones(len(symbols), dtype=np.bool_)
+    now = time.time()
+
+    for i, symbol in enumerate(symbols):
+        state = leg_states.get(symbol)
+        if (state is not None and now - state[4] < LEG_STATE_MAX_AGE
+                and abs(spots[i] - state[2]) <= LEG_SPOT_TOLERANCE * state[2]
+                and abs(prices[i] - state[3]) <= LEG_PRICE_TOLERANCE * state[3]):
+            sigmas[i], deltas[i] = state[0], state[1]
+            stale[i] = False
+
+    if stale.any():
+        sigmas[stale], deltas[stale] = calculate_implied_volatility_and_delta_vec(
+            prices[stale], spots[stale], strikes[stale], risk_free_rate, expiries[stale], div_yields[stale], is_calls[stale])
+        for i in np.flatnonzero(stale):
+            leg_states[symbols[i]] = (sigmas[i], deltas[i], spots[i], prices[i], now)
+
+    for symbol in leg_states.keys() - set(symbols):
+        del leg_states[symbol]
+
+    return sigmas, deltas
+
+def parse_option_symbol(symbol):
+    """
+    Parse the contract terms out of a Schwab option symbol.
+
+    Schwab option symbols follow the OCC layout: the root padded to six characters,
+    the expiration as YYMMDD, 'C' or 'P', then the strike times 1000 as eight digits
+    (e.g. 'AAPL  240621C00190000'). The fields are read at fixed offsets from the end.
+
+    Parameters:
+    - symbol (str): Option symbol.
+
+    Returns:
+    - tuple: Expiration datetime, strike price and whether the option is a call.
+    """
+    terms = symbol[-15:]
+    expiration_time = datetime(2000 + int(terms[0:2]), int(terms[2:4]), int(terms[4:6]))
+
+    return expiration_time, int(terms[7:]) / 1000, terms[6] == 'C'
+
+async def fetch_quotes(symbols, fields=None):
+    """
+    Fetch quotes for a group of symbols in a single request.
+
+    The request is bounded by QUOTE_TIMEOUT so that one stalled call cannot hold up
+    the rest of the hedge cycle. At most MAX_CONCURRENT_QUOTE_REQUESTS requests are in
+    flight at once to stay within Schwab's rate limits.
+
+    Parameters:
+    - symbols (list): Underlying and option symbols to quote.
+    - fields (list, optional): Quote fields to request. Defaults to all fields.
+
+    Returns:
+    - dict: Quote data keyed by symbol.
+    """
+    async with quote_semaphore:
+        resp = await with_retry(lambda: asyncio.wait_for(client.get_quotes(symbols, fields=fields), timeout=QUOTE_TIMEOUT))
+    assert resp.status_code == httpx.codes.OK
+
+    return await decode_json(resp.content)
+
+async def with_retry(request):
+    """
+    Await a Schwab request, retrying transient failures with exponential backoff and jitter.
+
+    Transport errors, timeouts, 429 and 5xx responses are retried up to
+    MAX_REQUEST_ATTEMPTS times in total, waiting RETRY_BASE_DELAY * 2**attempt seconds
+    plus up to 50 ms of jitter between attempts. Any other response is returned as is.
+
+    Parameters:
+    - request (callable): Function returning a new request coroutine on each call.
+
+    Returns:
+    - httpx.Response: The last response received.
+    """
+    for attempt in range(MAX_REQUEST_ATTEMPTS):
+        try:
+            resp = await request()
+            if resp.status_code != httpx.codes.TOO_MANY_REQUESTS and resp.status_code < 500:
+                return resp
+            if attempt == MAX_REQUEST_ATTEMPTS - 1:
+                return resp
+        except (httpx.TransportError, asyncio.TimeoutError):
+            if attempt == MAX_REQUEST_ATTEMPTS - 1:
+                raise
+
+        await asyncio.sleep(RETRY_BASE_DELAY * 2 ** attempt + random.random() * 0.05)
+
+async def decode_json(content):
+    """
+    Decode a JSON response body.
+
+    Bodies larger than LARGE_PAYLOAD_SIZE are decoded in a worker thread so that a
+    large account or quote payload does not stall the other in-flight requests.
+    Smaller bodies are decoded inline, where thread dispatch would cost more than
+    the decode itself.
+
+    Parameters:
+    - content (bytes): The raw response body.
+
+    Returns:
+    - dict: The decoded JSON document.
+    """
+    if len(content) > LARGE_PAYLOAD_SIZE:
+        return await asyncio.to_thread(json.loads, content)
+    return json.loads(content)
+
+async def refresh_risk_free_rate():
+    """
+    Refresh the risk-free rate from the latest SOFR observation.
+
+    The rate is cached and only re-fetched from FRED once it is older than
+    RISK_FREE_RATE_TTL, so long-running sessions pick up new fixings without
+    querying FRED on every rebalance. fredapi is synchronous, so the request runs
+    in a worker thread to keep the event loop free.
+    """
+    global risk_free_rate, risk_free_rate_updated
+
+    if time.time() - risk_free_rate_updated < RISK_FREE_RATE_TTL:
+        return
+
+    sofr_data = await asyncio.to_thread(fred.get_series, 'SOFR')
+    risk_free_rate = (sofr_data.iloc[-1] / 100)
+    risk_free_rate_updated = time.time()
+
 def load_config():
     """
     Load configuration from environment variables and validate them.
@@ -219,7 +512,8 @@ def load_config():
         "SCHWAB_ACCOUNT_HASH": os.getenv('SCHWAB_ACCOUNT_HASH'),
         "FRED_API_KEY": os.getenv('FRED_API_KEY'),
         "HEDGING_FREQUENCY": os.getenv('HEDGING_FREQUENCY'),
-        "DRY_RUN": os.getenv('DRY_RUN', 'True').lower() in ['true', '1', 'yes']
+        "DRY_RUN": os.getenv('DRY_RUN', 'True').lower() in ['true', '1', 'yes'],
+        "LOG_LEVEL": os.getenv('LOG_LEVEL', 'INFO').upper()
     }
 
     for key, value in config.items():
@@ -230,16 +524,9 @@ def load_config():
         config["HEDGING_FREQUENCY"] = float(config["HEDGING_FREQUENCY"])
     except ValueError:
         raise ValueError("HEDGING_FREQUENCY environment variable must be a valid float")
-    
-def precompile_numba_functions():
-    """
-    Precompile Numba functions to improve performance.
-
-    This method calls Numba-compiled functions with sample data to ensure they are precompiled,
-    reducing latency during actual execution.
-    """
-    calculate_implied_volatility_baw(0.1, 100.0, 100.0, 0.01, 0.5, option_type='calls')
-    calculate_delta(100.0, 100.0, 0.5, 0.01, 0.2, option_type='calls')
 
+    if not isinstance(logging.getLevelName(config["LOG_LEVEL"]), int):
+        raise ValueError("LOG_LEVEL environment variable must be a valid logging level")
+    
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,12 +1,18 @@
 import numpy as np
 from math import log, sqrt, exp
-from numba import njit
+from numba import njit, guvectorize
 
-@njit
+INV_SQRT2 = 0.7071067811865475  # 1 / sqrt(2)
+
+@njit(fastmath=True, cache=True)
 def calculate_delta(S, K, T, r, sigma, q=0.0, option_type='calls'):
     """
     Calculate the delta of an option using the Black-Scholes formula with custom normal_cdf and dividend yield.
 
+    This is the delta used to size the hedge. It is N(d1) (N(d1) - 1 for puts) without
+    the exp(-q * T) dividend discount, so it differs from the delta returned by
+    calculate_greeks_bs whenever q > 0.
+
     Parameters:
     - S (float): Current stock price.
     - K (float): Strike price.
@@ -30,10 +36,14 @@ def calculate_delta(S, K, T, r, sigma, q=0.0, option_type='calls'):
 
     return delta
 
-@njit
+@njit(fastmath=True, cache=True)
 def calculate_gamma(S, K, T, r, sigma, q=0.0, option_type='calls'):
     """
-    Calculate the gamma of an option using numerical differentiation and considering dividend yield.
+    Calculate the gamma of an option considering dividend yield.
+
+    Uses the closed-form Black-Scholes gamma. The Barone-Adesi Whaley pricer in this module
+    takes the negative root for q2, which is never positive, so it never adds an
+    early-exercise premium and differentiating it would give the same value.
 
     Parameters:
     - S (float): Current stock price.
@@ -47,20 +57,41 @@ def calculate_gamma(S, K, T, r, sigma, q=0.0, option_type='calls'):
     Returns:
     - float: The gamma of the option.
     """
-    h = 1e-4
+    return calculate_greeks_bs(S, K, T, r, sigma, q, option_type)[1]
+
+@njit(fastmath=True, cache=True)
+def calculate_vega(S, K, T, r, sigma, q=0.0, option_type='calls'):
+    """
+    Calculate the vega of an option considering dividend yield.
 
-    price_plus = barone_adesi_whaley_american_option_price(S + h, K, T, r, sigma, q, option_type)
-    price = barone_adesi_whaley_american_option_price(S, K, T, r, sigma, q, option_type)
-    price_minus = barone_adesi_whaley_american_option_price(S - h, K, T, r, sigma, q, option_type)
+    Uses the closed-form Black-Scholes vega. The Barone-Adesi Whaley pricer in this module
+    takes the negative root for q2, which is never positive, so it never adds an
+    early-exercise premium and differentiating it would give the same value.
 
-    gamma = (price_plus - 2 * price + price_minus) / (h * h)
+    Parameters:
+    - S (float): Current stock price.
+    - K (float): Strike price.
+    - T (float): Time to maturity (in years).
+    - r (float): Risk-free interest rate (as a decimal).
+    - sigma (float): Volatility of the underlying asset.
+    - q (float, optional): Continuous dividend yield.
+    - option_type (str, optional): 'calls' or 'puts'.
 
-    return gamma
+    Returns:
+    - float: The vega of the option.
+    """
+    return calculate_greeks_bs(S, K, T, r, sigma, q, option_type)[2]
 
-@njit
-def calculate_vega(S, K, T, r, sigma, q=0.0, option_type='calls'):
+@njit(fastmath=True, cache=True)
+def calculate_greeks_bs(S, K, T, r, sigma, q=0.0, option_type='calls'):
     """
-    Calculate the vega of an option using numerical differentiation and considering dividend yield.
+    Calculate delta, gamma, vega, theta and rho from the closed-form Black-Scholes formulas with dividend yield.
+
+    d1, d2 and the normal density at d1 are computed once and shared by all five Greeks.
+
+    The delta returned here is the dividend-discounted exp(-q * T) * N(d1) and so does
+    not match calculate_delta, which the hedge uses, whenever q > 0. Use calculate_delta
+    for hedge sizing.
 
     Parameters:
     - S (float): Current stock price.
@@ -72,18 +103,60 @@ def calculate_vega(S, K, T, r, sigma, q=0.0, option_type='calls'):
     - option_type (str, optional): 'calls' or 'puts'.
 
     Returns:
-    - float: The vega of the option.
+    - tuple: Delta, gamma, vega, theta (per year) and rho of the option.
+    """
+    sqrt_T = sqrt(T)
+    d1 = (log(S / K) + (r - q + 0.5 * sigma ** 2) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    pdf_d1 = normal_pdf(d1)
+    dividend_discount = exp(-q * T)
+    rate_discount = exp(-r * T)
+
+    gamma = dividend_discount * pdf_d1 / (S * sigma * sqrt_T)
+    vega = S * dividend_discount * pdf_d1 * sqrt_T
+    time_decay = -S * dividend_discount * pdf_d1 * sigma / (2 * sqrt_T)
+
+    if option_type == 'calls':
+        cdf_d1 = normal_cdf(d1)
+        cdf_d2 = normal_cdf(d2)
+        delta = dividend_discount * cdf_d1
+        theta = time_decay - r * K * rate_discount * cdf_d2 + q * S * dividend_discount * cdf_d1
+        rho = K * T * rate_discount * cdf_d2
+    elif option_type == 'puts':
+        cdf_neg_d1 = normal_cdf(-d1)
+        cdf_neg_d2 = normal_cdf(-d2)
+        delta = -dividend_discount * cdf_neg_d1
+        theta = time_decay + r * K * rate_discount * cdf_neg_d2 - q * S * dividend_discount * cdf_neg_d1
+        rho = -K * T * rate_discount * cdf_neg_d2
+    else:
+        raise ValueError("option_type must be 'calls' or 'puts'.")
+
+    return delta, gamma, vega, theta, rho
+
+@njit(fastmath=True, cache=True)
+def calculate_vega_bs(S, K, T, r, sigma, q=0.0):
     """
-    h = 1e-4
+    Calculate the closed-form Black-Scholes vega with dividend yield.
 
-    price_plus = barone_adesi_whaley_american_option_price(S, K, T, r, sigma + h, q, option_type)
-    price_minus = barone_adesi_whaley_american_option_price(S, K, T, r, sigma - h, q, option_type)
+    Computes only what vega needs, for use in the implied volatility iteration.
 
-    vega = (price_plus - price_minus) / (2 * h)
+    Parameters:
+    - S (float): Current stock price.
+    - K (float): Strike price.
+    - T (float): Time to maturity (in years).
+    - r (float): Risk-free interest rate (as a decimal).
+    - sigma (float): Volatility of the underlying asset.
+    - q (float, optional): Continuous dividend yield.
+
+    Returns:
+    - float: The vega of the option, identical for calls and puts.
+    """
+    sqrt_T = sqrt(T)
+    d1 = (log(S / K) + (r - q + 0.5 * sigma ** 2) * T) / (sigma * sqrt_T)
 
-    return vega
+    return S * exp(-q * T) * normal_pdf(d1) * sqrt_T
 
-@njit
+@njit('f8(f8)', fastmath=True, cache=True)
 def erf(x):
     """
     Approximation of the error function (erf) using a high-precision method.
@@ -103,15 +176,28 @@ def erf(x):
     )
     p = 0.3275911
 
-    sign = 1 if x >= 0 else -1
-    x = abs(x)
-    
-    t = 1.0 / (1.0 + p * x)
-    y = 1.0 - (((((a5 * t + a4) * t + a3) * t + a2) * t + a1) * t * np.exp(-x * x))
+    sign = 1.0 if x >= 0.0 else -1.0
+    ax = abs(x)
+
+    t = 1.0 / (1.0 + p * ax)
+    y = 1.0 - (((((a5 * t + a4) * t + a3) * t + a2) * t + a1) * t * exp(-ax * ax))
 
     return sign * y
 
-@njit
+@njit('f8(f8)', fastmath=True, cache=True)
+def normal_pdf(x):
+    """
+    Probability density function (PDF) of the standard normal distribution.
+
+    Parameters:
+    - x (float): The input value.
+
+    Returns:
+    - float: The PDF value.
+    """
+    return exp(-0.5 * x * x) / sqrt(2.0 * np.pi)
+
+@njit('f8(f8)', fastmath=True, cache=True)
 def normal_cdf(x):
     """
     Approximation of the cumulative distribution function (CDF) for a standard normal distribution.
@@ -122,9 +208,9 @@ def normal_cdf(x):
     Returns:
     - float: The CDF value.
     """
-    return 0.5 * (1.0 + erf(x / np.sqrt(2.0)))
+    return 0.5 * (1.0 + erf(x * INV_SQRT2))
 
-@njit
+@njit(fastmath=True, cache=True)
 def barone_adesi_whaley_american_option_price(S, K, T, r, sigma, q=0.0, option_type='calls'):
     """
     Calculate the price of an American option using the Barone-Adesi Whaley model with dividends.
@@ -152,7 +238,7 @@ def barone_adesi_whaley_american_option_price(S, K, T, r, sigma, q=0.0, option_t
         european_price = S * exp(-q * T) * normal_cdf(d1) - K * exp(-r * T) * normal_cdf(d2)
         if q >= r:
             return european_price
-        if q2 < 0:
+        if q2 <= 0:
             return european_price
         S_critical = K / (1 - 1 / q2)
         if S >= S_critical:
@@ -165,7 +251,7 @@ def barone_adesi_whaley_american_option_price(S, K, T, r, sigma, q=0.0, option_t
         european_price = K * exp(-r * T) * normal_cdf(-d2) - S * exp(-q * T) * normal_cdf(-d1)
         if q >= r:
             return european_price
-        if q2 < 0:
+        if q2 <= 0:
             return european_price
         S_critical = K / (1 + 1 / q2)
         if S <= S_critical:
@@ -177,7 +263,7 @@ def barone_adesi_whaley_american_option_price(S, K, T, r, sigma, q=0.0, option_t
     else:
         raise ValueError("option_type must be 'calls' or 'puts'.")
 
-@njit
+@njit(fastmath=True, cache=True)
 def calculate_implied_volatility_baw(option_price, S, K, r, T, q=0.0, option_type='calls', max_iterations=100, tolerance=1e-8):
     """
     Calculate the implied volatility using the Barone-Adesi Whaley model with dividends.
@@ -190,7 +276,7 @@ def calculate_implied_volatility_baw(option_price, S, K, r, T, q=0.0, option_typ
     - T (float): Time to expiration in years.
     - q (float, optional): Continuous dividend yield. Defaults to 0.0.
     - option_type (str, optional): Type of option ('calls' or 'puts'). Defaults to 'calls'.
-    - max_iterations (int, optional): Maximum number of iterations for the bisection method. Defaults to 100.
+    - max_iterations (int, optional): Maximum number of Newton-Raphson iterations. Defaults to 100.
     - tolerance (float, optional): Convergence tolerance. Defaults to 1e-8.
 
     Returns:
@@ -199,19 +285,87 @@ def calculate_implied_volatility_baw(option_price, S, K, r, T, q=0.0, option_typ
     lower_vol = 1e-5
     upper_vol = 5.0
 
+    # The price is increasing in volatility, so quotes outside the prices at the
+    # bracket ends cannot be matched and the solver would only converge to that end.
+    if option_price <= barone_adesi_whaley_american_option_price(S, K, T, r, lower_vol, q, option_type):
+        return lower_vol
+    if option_price >= barone_adesi_whaley_american_option_price(S, K, T, r, upper_vol, q, option_type):
+        return upper_vol
+
+    # Brenner-Subrahmanyam approximation as the starting point.
+    sigma = sqrt(2 * np.pi / T) * option_price / S
+    if not (lower_vol < sigma < upper_vol):
+        sigma = (lower_vol + upper_vol) / 2
+
     for i in range(max_iterations):
-        mid_vol = (lower_vol + upper_vol) / 2
-        price = barone_adesi_whaley_american_option_price(S, K, T, r, mid_vol, q, option_type)
+        price = barone_adesi_whaley_american_option_price(S, K, T, r, sigma, q, option_type)
+        diff = price - option_price
 
-        if abs(price - option_price) < tolerance:
-            return mid_vol
+        if abs(diff) < tolerance:
+            return sigma
 
-        if price > option_price:
-            upper_vol = mid_vol
+        if diff > 0:
+            upper_vol = sigma
         else:
-            lower_vol = mid_vol
+            lower_vol = sigma
 
         if upper_vol - lower_vol < tolerance:
             break
 
-    return mid_vol
+        # Take the Newton step unless vega is too flat or the step leaves the bracket,
+        # in which case fall back to bisecting it.
+        vega = calculate_vega_bs(S, K, T, r, sigma, q)
+        if vega > 1e-8 and lower_vol < sigma - diff / vega < upper_vol:
+            sigma = sigma - diff / vega
+        else:
+            sigma = (lower_vol + upper_vol) / 2
+
+    return sigma
+
+@njit(fastmath=True, cache=True)
+def calculate_implied_volatility_and_delta(option_price, S, K, r, T, q=0.0, option_type='calls', max_iterations=100, tolerance=1e-8):
+    """
+    Calculate the implied volatility using the Barone-Adesi Whaley model and the delta it implies in one kernel.
+
+    Parameters:
+    - option_price (float): Observed option price (mid-price).
+    - S (float): Current stock price.
+    - K (float): Strike price of the option.
+    - r (float): Risk-free interest rate.
+    - T (float): Time to expiration in years.
+    - q (float, optional): Continuous dividend yield. Defaults to 0.0.
+    - option_type (str, optional): Type of option ('calls' or 'puts'). Defaults to 'calls'.
+    - max_iterations (int, optional): Maximum number of Newton-Raphson iterations. Defaults to 100.
+    - tolerance (float, optional): Convergence tolerance. Defaults to 1e-8.
+
+    Returns:
+    - tuple: The implied volatility and the delta of the option.
+    """
+    sigma = calculate_implied_volatility_baw(option_price, S, K, r, T, q, option_type, max_iterations, tolerance)
+    delta = calculate_delta(S, K, T, r, sigma, q, option_type)
+
+    return sigma, delta
+
+@guvectorize(['void(float64, float64, float64, float64, float64, float64, boolean, float64[:], float64[:])'],
+             '(),(),(),(),(),(),()->(),()', target='parallel', fastmath=True, cache=True)
+def calculate_implied_volatility_and_delta_vec(option_price, S, K, r, T, q, is_call, sigma, delta):
+    """
+    Calculate implied volatilities and deltas for arrays of options in a single call.
+
+    Element-wise version of calculate_implied_volatility_and_delta; scalar arguments
+    are broadcast against the array ones.
+
+    Parameters:
+    - option_price (ndarray): Observed option prices (mid-price).
+    - S (ndarray): Current stock prices.
+    - K (ndarray): Strike prices.
+    - r (float): Risk-free interest rate.
+    - T (ndarray): Times to expiration in years.
+    - q (ndarray): Continuous dividend yields.
+    - is_call (ndarray): True for calls, False for puts.
+
+    Returns:
+    - tuple: Arrays of implied volatilities and deltas.
+    """
+    option_type = 'calls' if is_call else 'puts'
+    sigma[0], delta[0] = calculate_implied_volatility_and_delta(option_price, S, K, r, T, q, option_type)